@@ -107,18 +107,18 @@ async def classify_image(
         with open(file_path, "wb") as buffer:
             buffer.write(content)
         
-        # Collect image metadata
-        from PIL import Image as PILImage
-        with PILImage.open(file_path) as img:
-            image_metadata = {
-                "filename": file.filename,
-                "size": file_size,
-                "format": img.format,
-                "dimensions": [img.width, img.height],
-                "width": img.width,
-                "height": img.height,
-                "has_transparency": img.mode in ('RGBA', 'LA') or 'transparency' in img.info
-            }
+        # Collect image metadata from the header; process_image does the one full decode
+        metadata, img = image_service.open_and_introspect(file_path)
+        img.close()
+        image_metadata = {
+            "filename": file.filename,
+            "size": file_size,
+            "format": metadata["format"],
+            "dimensions": [metadata["width"], metadata["height"]],
+            "width": metadata["width"],
+            "height": metadata["height"],
+            "has_transparency": metadata["has_transparency"]
+        }
         logger.info(f"Image metadata collected: {image_metadata}")
         
         # Process image
@@ -136,7 +136,7 @@ async def classify_image(
             processed_image, 
             model_name=None,  # Use default model selection
             confidence_threshold=0.01,  # Low threshold to show results
-            use_cache=False  # Disable cache to test fix
+            image_bytes=content  # Cache key from the upload, not the decoded array
         )
         logger.info("Classification completed")
         
@@ -20,6 +20,8 @@ class Settings(BaseSettings):
         default=[".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"]
     )
     UPLOAD_DIR: str = Field(default="uploads")
+    # Processed image arrays kept in memory per worker; 0 disables the cache
+    IMAGE_CACHE_MAX_BYTES: int = Field(default=64 * 1024 * 1024, env="IMAGE_CACHE_MAX_BYTES")
     
     # Database Settings
     DATABASE_URL: str = Field(
@@ -33,8 +35,14 @@ class Settings(BaseSettings):
         env="REDIS_URL"
     )
     REDIS_PASSWORD: str = Field(default="", env="REDIS_PASSWORD")
+    REDIS_POOL_SIZE: int = Field(default=16, env="REDIS_POOL_SIZE")
+    REDIS_POOL_TIMEOUT: int = Field(default=5, env="REDIS_POOL_TIMEOUT")  # seconds to wait for a free connection
     CACHE_TTL: int = Field(default=300, env="CACHE_TTL")  # 5 minutes default
     CACHE_ENABLED: bool = Field(default=True, env="CACHE_ENABLED")
+    # In-process cache in front of Redis. With several workers, keep the TTL
+    # well below CACHE_TTL since local copies are not invalidated across processes.
+    CACHE_LOCAL_TTL: int = Field(default=5, env="CACHE_LOCAL_TTL")  # seconds
+    CACHE_LOCAL_MAXSIZE: int = Field(default=1024, env="CACHE_LOCAL_MAXSIZE")
     
     # AI/ML Settings
     GOOGLE_CLOUD_PROJECT: str = Field(default="", env="GOOGLE_CLOUD_PROJECT")
@@ -44,6 +52,10 @@ class Settings(BaseSettings):
     DEFAULT_MODEL: str = Field(default="auto")  # Will be dynamically set by intelligent selection
     CONFIDENCE_THRESHOLD: float = Field(default=0.01)  # Lowered for testing
     MODEL_STORAGE_PATH: str = Field(default="models", env="MODEL_STORAGE_PATH")
+    INFERENCE_RUNTIME: str = Field(default="native", env="INFERENCE_RUNTIME")  # "native" or "onnx"
+    QUANTIZE_MODELS: bool = Field(default=False, env="QUANTIZE_MODELS")  # INT8 weights for CPU inference
+    INFERENCE_MAX_BATCH_SIZE: int = Field(default=16, env="INFERENCE_MAX_BATCH_SIZE")  # 1 disables micro-batching
+    INFERENCE_BATCH_WAIT_MS: float = Field(default=5.0, env="INFERENCE_BATCH_WAIT_MS")  # wait for a batch to fill
     
     # Security Settings
     SECRET_KEY: str = Field(
@@ -151,5 +151,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
+        loop="auto",  # uvloop when installed (uvicorn[standard], non-Windows), else asyncio
         log_level="info"
     )
\ No newline at end of file
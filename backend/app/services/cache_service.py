@@ -1,22 +1,113 @@
 """Redis caching service for performance optimization."""
 
-import json
+import asyncio
 import hashlib
 import logging
-from typing import Any, Optional, Union, Dict, List
-from datetime import datetime, timedelta
+import time
+from typing import Any, Optional, Union, Dict, List, Tuple
+import orjson
+from cachetools import TTLCache
 import redis.asyncio as redis
 from redis.asyncio import Redis
 from app.core.config import settings
 
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Background writer tuning for fire-and-forget cache sets
+WRITE_QUEUE_MAXSIZE = 10000
+WRITE_BATCH_SIZE = 128
+WRITE_BATCH_WINDOW = 0.002  # seconds to let concurrent writes accumulate
+
+# Redis accepts both; keys built here are bytes so redis-py skips re-encoding them
+CacheKey = Union[str, bytes]
+
+# (key, payload, ttl, index_key); a dict payload is written as a Redis hash
+PendingWrite = Tuple[CacheKey, Union[bytes, Dict[str, bytes]], int, Optional[CacheKey]]
+
+KEY_NAMESPACE = b"ai_service:"
+# Pre-encoded "ai_service:<prefix>:" heads for the prefixes used on hot paths
+KEY_PREFIXES = {
+    prefix: KEY_NAMESPACE + prefix.encode() + b":"
+    for prefix in ("classification", "model_metadata", "user_stats", "index:user")
+}
+
+# How long a get_cache_stats() snapshot is reused before querying Redis again
+STATS_CACHE_TTL = 1.0  # seconds
+
+# Keys per UNLINK command when invalidating many entries
+UNLINK_BATCH_SIZE = 500
+
+# Identifiers shorter than this are used verbatim in keys; longer ones are hashed
+MAX_LITERAL_IDENTIFIER_LENGTH = 120
+
+# Payloads above this size are zstd-compressed before being sent to Redis
+COMPRESSION_THRESHOLD = 1024
+# Marker byte for compressed values; plain JSON can never start with it
+ZSTD_MARKER = b"\x01"
+
+if ZSTD_AVAILABLE:
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+
+def _json_default(value: Any) -> Any:
+    """orjson fallback: sets become lists, anything else its string form."""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return str(value)
+
+def _pack(payload: bytes) -> bytes:
+    """Compress large payloads; small ones are stored as plain JSON."""
+    if ZSTD_AVAILABLE and len(payload) > COMPRESSION_THRESHOLD:
+        return ZSTD_MARKER + _zstd_compressor.compress(payload)
+    return payload
+
+def _unpack(raw: bytes) -> bytes:
+    """Reverse _pack."""
+    if raw[:1] == ZSTD_MARKER:
+        if not ZSTD_AVAILABLE:
+            raise ValueError("compressed cache value but zstandard is not installed")
+        return _zstd_decompressor.decompress(raw[1:])
+    return raw
+
+def _digest(data: bytes) -> str:
+    """Fast non-cryptographic fingerprint of a byte payload (32 hex chars)."""
+    if BLAKE3_AVAILABLE:
+        return blake3.blake3(data).hexdigest(length=16)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
 class CacheService:
     """Redis-based caching service for application performance optimization."""
     
     def __init__(self):
         self.redis_client: Optional[Redis] = None
         self.enabled = settings.CACHE_ENABLED
+        # Short-lived in-process copy of raw payloads to absorb read bursts. Opt-in
+        # (local=True) for immutable results only: counters and API keys must see
+        # other workers' writes immediately
+        self._local_cache: TTLCache = TTLCache(
+            maxsize=settings.CACHE_LOCAL_MAXSIZE,
+            ttl=settings.CACHE_LOCAL_TTL
+        )
+        # Same, for model metadata hashes (field -> encoded value)
+        self._local_metadata: TTLCache = TTLCache(
+            maxsize=settings.CACHE_LOCAL_MAXSIZE,
+            ttl=settings.CACHE_LOCAL_TTL
+        )
+        self._stats_snapshot: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
         
     async def connect(self) -> bool:
         """Connect to Redis server."""
@@ -25,17 +116,25 @@ class CacheService:
             return False
             
         try:
-            self.redis_client = redis.from_url(
+            # Bounded pool: callers wait for a free connection instead of
+            # opening a new socket per concurrent request
+            pool = redis.BlockingConnectionPool.from_url(
                 settings.REDIS_URL,
                 password=settings.REDIS_PASSWORD if settings.REDIS_PASSWORD else None,
-                decode_responses=True,
+                max_connections=settings.REDIS_POOL_SIZE,
+                timeout=settings.REDIS_POOL_TIMEOUT,
+                decode_responses=False,  # values are orjson bytes
                 retry_on_timeout=True,
                 health_check_interval=30
             )
+            self.redis_client = Redis(connection_pool=pool)
             
             # Test connection
             await self.redis_client.ping()
             logger.info("Connected to Redis cache successfully")
+            
+            self._write_queue = asyncio.Queue(maxsize=WRITE_QUEUE_MAXSIZE)
+            self._writer_task = asyncio.create_task(self._writer_loop())
             return True
             
         except Exception as e:
@@ -45,65 +144,159 @@ class CacheService:
     
     async def disconnect(self):
         """Disconnect from Redis server."""
+        if self._writer_task:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+            
+            # Flush whatever was still queued
+            pending = self._drain_write_queue(WRITE_QUEUE_MAXSIZE)
+            if pending:
+                await self._flush_writes(pending)
+        
         if self.redis_client:
-            await self.redis_client.close()
+            await self.redis_client.aclose()
+            await self.redis_client.connection_pool.disconnect()
             logger.info("Disconnected from Redis cache")
     
-    def _generate_key(self, prefix: str, identifier: Union[str, Dict, List]) -> str:
-        """Generate cache key with consistent hashing."""
-        if isinstance(identifier, (dict, list)):
-            identifier = json.dumps(identifier, sort_keys=True)
+    def _generate_key(self, prefix: str, identifier: Union[str, Dict, List]) -> bytes:
+        """Generate a namespaced cache key, hashing only long or structured identifiers."""
+        head = KEY_PREFIXES.get(prefix) or KEY_NAMESPACE + prefix.encode() + b":"
         
-        key_data = f"{prefix}:{identifier}"
-        return f"ai_service:{hashlib.md5(key_data.encode()).hexdigest()}"
+        if isinstance(identifier, str) and len(identifier) < MAX_LITERAL_IDENTIFIER_LENGTH:
+            return head + identifier.encode()
+        
+        if isinstance(identifier, (dict, list)):
+            data = orjson.dumps(identifier, option=orjson.OPT_SORT_KEYS)
+        else:
+            data = identifier.encode()
+        return head + _digest(data).encode()
     
-    async def get(self, key: str) -> Optional[Any]:
-        """Get value from cache."""
+    def _user_index_key(self, user_id: int) -> bytes:
+        """Key of the set tracking all cache keys belonging to a user."""
+        return KEY_PREFIXES["index:user"] + str(user_id).encode()
+    
+    async def _get_raw(self, key: CacheKey, local: bool = False) -> Optional[bytes]:
+        """Get the encoded JSON payload for a key, checking the local cache first if local."""
+        value = self._local_cache.get(key) if local else None
+        if value is None:
+            value = await self.redis_client.get(key)
+            if value:
+                value = _unpack(value)
+                if local:
+                    self._local_cache[key] = value
+        return value or None
+    
+    async def _get_many_raw(self, keys: List[CacheKey], local: bool = False) -> List[Optional[bytes]]:
+        """Get encoded payloads for several keys with a single MGET (local-cache misses only, if local)."""
+        values = [self._local_cache.get(key) if local else None for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            fetched = await self.redis_client.mget([keys[i] for i in missing])
+            for i, raw in zip(missing, fetched):
+                if raw:
+                    values[i] = _unpack(raw)
+                    if local:
+                        self._local_cache[keys[i]] = values[i]
+        return [value or None for value in values]
+    
+    async def get(self, key: CacheKey, local: bool = False) -> Optional[Any]:
+        """
+        Get value from cache.
+        
+        local=True also serves the value from this process's short-lived copy,
+        which may lag other workers' writes by up to CACHE_LOCAL_TTL.
+        """
         if not self.enabled or not self.redis_client:
             return None
             
         try:
-            value = await self.redis_client.get(key)
+            value = await self._get_raw(key, local)
             if value:
-                return json.loads(value)
+                return orjson.loads(value)
             return None
             
         except Exception as e:
             logger.error(f"Cache get error for key {key}: {e}")
             return None
     
-    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
-        """Set value in cache with optional TTL."""
+    async def set(
+        self, 
+        key: CacheKey, 
+        value: Any, 
+        ttl: Optional[int] = None,
+        await_write: bool = True,
+        local: bool = False
+    ) -> bool:
+        """
+        Set value in cache with optional TTL.
+        
+        With await_write=False the write is queued for the background
+        writer and the call returns without waiting for Redis. local=True
+        also keeps a copy for get(..., local=True) in this process.
+        """
+        if not self.enabled or not self.redis_client:
+            return False
+            
+        try:
+            payload = self.encode(value)
+        except Exception as e:
+            logger.error(f"Cache set error for key {key}: {e}")
+            return False
+        return await self.set_encoded(key, payload, ttl, await_write, local)
+    
+    @staticmethod
+    def encode(value: Any) -> bytes:
+        """Serialise a value the way set() stores it."""
+        return orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    
+    async def set_encoded(
+        self,
+        key: CacheKey,
+        payload: bytes,
+        ttl: Optional[int] = None,
+        await_write: bool = True,
+        local: bool = False
+    ) -> bool:
+        """Like set(), for a value the caller already serialised with encode()."""
         if not self.enabled or not self.redis_client:
             return False
             
         try:
             ttl = ttl or settings.CACHE_TTL
-            await self.redis_client.setex(
-                key, 
-                ttl, 
-                json.dumps(value, default=str)
-            )
+            if local:
+                self._local_cache[key] = payload
+            
+            if not await_write:
+                return self._enqueue_write((key, _pack(payload), ttl, None))
+            
+            await self.redis_client.setex(key, ttl, _pack(payload))
             return True
             
         except Exception as e:
             logger.error(f"Cache set error for key {key}: {e}")
             return False
     
-    async def delete(self, key: str) -> bool:
+    async def delete(self, key: CacheKey) -> bool:
         """Delete key from cache."""
         if not self.enabled or not self.redis_client:
             return False
             
         try:
-            await self.redis_client.delete(key)
+            self._local_cache.pop(key, None)
+            self._local_metadata.pop(key, None)
+            # UNLINK frees the value on a Redis background thread
+            await self.redis_client.unlink(key)
             return True
             
         except Exception as e:
             logger.error(f"Cache delete error for key {key}: {e}")
             return False
     
-    async def exists(self, key: str) -> bool:
+    async def exists(self, key: CacheKey) -> bool:
         """Check if key exists in cache."""
         if not self.enabled or not self.redis_client:
             return False
@@ -114,6 +307,57 @@ class CacheService:
             logger.error(f"Cache exists check error for key {key}: {e}")
             return False
     
+    def _enqueue_write(self, write: PendingWrite) -> bool:
+        """Queue a cache write for the background writer."""
+        if self._write_queue is None:
+            return False
+        try:
+            self._write_queue.put_nowait(write)
+            return True
+        except asyncio.QueueFull:
+            # A dropped cache write only costs a future cache miss
+            logger.debug(f"Cache write queue full, dropping write for key {write[0]}")
+            return False
+    
+    def _drain_write_queue(self, limit: int) -> List[PendingWrite]:
+        """Pop up to `limit` queued writes without waiting."""
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._write_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+    
+    async def _writer_loop(self):
+        """Coalesce queued writes into pipelined batches."""
+        while True:
+            first = await self._write_queue.get()
+            await asyncio.sleep(WRITE_BATCH_WINDOW)
+            batch = [first] + self._drain_write_queue(WRITE_BATCH_SIZE - 1)
+            await self._flush_writes(batch)
+    
+    async def _flush_writes(self, batch: List[PendingWrite]):
+        """Send a batch of writes to Redis in a single pipeline."""
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, payload, ttl, index_key in batch:
+                    if isinstance(payload, dict):
+                        # Replace the whole hash so removed fields don't linger
+                        pipe.unlink(key)
+                        # HSET rejects an empty mapping while the pipeline is built, which would drop the whole batch
+                        if payload:
+                            pipe.hset(key, mapping=payload)
+                            pipe.expire(key, ttl)
+                    else:
+                        pipe.setex(key, ttl, payload)
+                    if index_key:
+                        pipe.sadd(index_key, key)
+                        pipe.expire(index_key, ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Cache batch write error ({len(batch)} keys): {e}")
+    
     # Specialized caching methods for AI service
     
     async def cache_classification_result(
@@ -123,16 +367,9 @@ class CacheService:
         result: Dict[str, Any],
         ttl: int = 3600  # 1 hour default
     ) -> bool:
-        """Cache classification result."""
+        """Cache classification result (stored flat; the key already names the model)."""
         key = self._generate_key("classification", f"{image_hash}:{model_name}")
-        
-        cache_data = {
-            "result": result,
-            "cached_at": datetime.utcnow().isoformat(),
-            "model": model_name
-        }
-        
-        return await self.set(key, cache_data, ttl)
+        return await self.set(key, result, ttl, await_write=False, local=True)
     
     async def get_cached_classification(
         self, 
@@ -142,10 +379,50 @@ class CacheService:
         """Get cached classification result."""
         key = self._generate_key("classification", f"{image_hash}:{model_name}")
         
-        cached_data = await self.get(key)
-        if cached_data:
-            return cached_data.get("result")
-        return None
+        if not self.enabled or not self.redis_client:
+            return None
+            
+        try:
+            value = await self._get_raw(key, local=True)
+            return self._decode_classification(key, value) if value else None
+            
+        except Exception as e:
+            logger.error(f"Cache get error for key {key}: {e}")
+            return None
+    
+    async def mget_classifications(
+        self,
+        image_hashes: List[str],
+        model_name: str
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Get cached classification results for several images in one round-trip (None for misses)."""
+        if not self.enabled or not self.redis_client or not image_hashes:
+            return [None] * len(image_hashes)
+        
+        keys = [self._generate_key("classification", f"{image_hash}:{model_name}") for image_hash in image_hashes]
+        try:
+            values = await self._get_many_raw(keys, local=True)
+        except Exception as e:
+            logger.error(f"Cache mget error for {len(keys)} classification keys: {e}")
+            return [None] * len(keys)
+        
+        return [
+            self._decode_classification(key, value) if value else None
+            for key, value in zip(keys, values)
+        ]
+    
+    def _decode_classification(self, key: CacheKey, value: bytes) -> Optional[Dict[str, Any]]:
+        """Decode a cached classification payload; malformed entries count as misses."""
+        try:
+            # Plain decode: callers get the result exactly as it was cached, every key included
+            result = orjson.loads(value)
+        except orjson.JSONDecodeError as e:
+            logger.warning(f"Discarding malformed cached classification {key}: {e}")
+            return None
+        if not isinstance(result, dict) or "predictions" not in result:
+            logger.warning(f"Discarding malformed cached classification {key}")
+            return None
+        return result
     
     async def cache_model_metadata(
         self, 
@@ -153,14 +430,69 @@ class CacheService:
         metadata: Dict[str, Any],
         ttl: int = 1800  # 30 minutes default
     ) -> bool:
-        """Cache model metadata."""
+        """Cache model metadata as a Redis hash with one JSON-encoded value per field."""
+        if not self.enabled or not self.redis_client:
+            return False
+            
         key = self._generate_key("model_metadata", model_name)
-        return await self.set(key, metadata, ttl)
+        
+        try:
+            fields = {
+                field: orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+                for field, value in metadata.items()
+            }
+            self._local_metadata[key] = fields
+            return self._enqueue_write((key, fields, ttl, None))
+            
+        except Exception as e:
+            logger.error(f"Cache set error for key {key}: {e}")
+            return False
+    
+    async def _get_metadata_fields(self, key: bytes) -> Optional[Dict[str, bytes]]:
+        """Get the raw field mapping of a metadata hash, checking the local cache first."""
+        fields = self._local_metadata.get(key)
+        if fields is None:
+            raw = await self.redis_client.hgetall(key)
+            if not raw:
+                return None
+            fields = {field.decode(): value for field, value in raw.items()}
+            self._local_metadata[key] = fields
+        return fields
     
     async def get_cached_model_metadata(self, model_name: str) -> Optional[Dict[str, Any]]:
         """Get cached model metadata."""
+        if not self.enabled or not self.redis_client:
+            return None
+            
         key = self._generate_key("model_metadata", model_name)
-        return await self.get(key)
+        
+        try:
+            fields = await self._get_metadata_fields(key)
+            if fields is None:
+                return None
+            return {field: orjson.loads(value) for field, value in fields.items()}
+            
+        except Exception as e:
+            logger.error(f"Cache get error for key {key}: {e}")
+            return None
+    
+    async def get_model_metadata_field(self, model_name: str, field: str) -> Optional[Any]:
+        """Get a single cached metadata field without decoding the rest."""
+        if not self.enabled or not self.redis_client:
+            return None
+            
+        key = self._generate_key("model_metadata", model_name)
+        
+        try:
+            fields = self._local_metadata.get(key)
+            value = fields.get(field) if fields is not None else await self.redis_client.hget(key, field)
+            if value is None:
+                return None
+            return orjson.loads(value)
+            
+        except Exception as e:
+            logger.error(f"Cache get error for key {key}: {e}")
+            return None
     
     async def cache_user_stats(
         self, 
@@ -169,8 +501,27 @@ class CacheService:
         ttl: int = 600  # 10 minutes default
     ) -> bool:
         """Cache user statistics."""
+        if not self.enabled or not self.redis_client:
+            return False
+            
         key = self._generate_key("user_stats", str(user_id))
-        return await self.set(key, stats, ttl)
+        
+        try:
+            # Awaited rather than queued: a write still pending when invalidate_user_cache
+            # runs would put the stale stats back. The key is also tracked in the user's
+            # index set so invalidation never needs KEYS
+            payload = orjson.dumps(stats, default=str, option=orjson.OPT_NON_STR_KEYS)
+            index_key = self._user_index_key(user_id)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.setex(key, ttl, _pack(payload))
+                pipe.sadd(index_key, key)
+                pipe.expire(index_key, ttl)
+                await pipe.execute()
+            return True
+            
+        except Exception as e:
+            logger.error(f"Cache set error for key {key}: {e}")
+            return False
     
     async def get_cached_user_stats(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get cached user statistics."""
@@ -183,12 +534,17 @@ class CacheService:
             return False
             
         try:
-            # Pattern matching for user-related keys
-            pattern = f"ai_service:*user_stats*{user_id}*"
-            keys = await self.redis_client.keys(pattern)
+            # Look up the user's keys from the per-user index set
+            index_key = self._user_index_key(user_id)
+            keys = await self.redis_client.smembers(index_key)
             
             if keys:
-                await self.redis_client.delete(*keys)
+                keys = list(keys)
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for i in range(0, len(keys), UNLINK_BATCH_SIZE):
+                        pipe.unlink(*keys[i:i + UNLINK_BATCH_SIZE])
+                    pipe.unlink(index_key)
+                    await pipe.execute()
                 logger.info(f"Invalidated {len(keys)} cache entries for user {user_id}")
             
             return True
@@ -202,10 +558,20 @@ class CacheService:
         if not self.enabled or not self.redis_client:
             return {"enabled": False}
             
+        now = time.monotonic()
+        if self._stats_snapshot and now - self._stats_snapshot[0] < STATS_CACHE_TTL:
+            return dict(self._stats_snapshot[1])
+            
         try:
-            info = await self.redis_client.info()
+            # Fetch only the INFO sections we report, in one round trip
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.info("clients")
+                pipe.info("memory")
+                pipe.info("stats")
+                clients, memory, stats = await pipe.execute()
+            info = {**clients, **memory, **stats}
             
-            return {
+            result = {
                 "enabled": True,
                 "connected_clients": info.get("connected_clients", 0),
                 "used_memory": info.get("used_memory_human", "0B"),
@@ -216,6 +582,8 @@ class CacheService:
                     info.get("keyspace_misses", 0)
                 )
             }
+            self._stats_snapshot = (now, result)
+            return dict(result)
             
         except Exception as e:
             logger.error(f"Cache stats error: {e}")
@@ -237,7 +605,7 @@ async def get_cache_service() -> CacheService:
 
 def cache_key_for_image(image_data: bytes, model_name: str) -> str:
     """Generate consistent cache key for image classification."""
-    image_hash = hashlib.md5(image_data).hexdigest()
+    image_hash = _digest(image_data)
     return f"classification:{image_hash}:{model_name}"
 
 def cache_key_for_user_history(user_id: int, page: int = 1, limit: int = 10) -> str:
@@ -3,16 +3,30 @@ Team collaboration service for shared workspaces and projects.
 Enables users to collaborate on AI classification projects.
 """
 
-import json
+import asyncio
+import atexit
+import itertools
+import os
 import uuid
-from typing import Dict, List, Any, Optional
+from collections import defaultdict, deque
+from typing import DefaultDict, Deque, Dict, FrozenSet, List, Any, Mapping, Optional, Set
 from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
+from types import MappingProxyType
 
-from app.services.cache_service import CacheService
+import orjson
+
+from app.services.cache_service import cache_service
 from app.core.config import settings
 
+# Activities kept in memory (and on disk after compaction)
+MAX_ACTIVITIES = 1000
+# Appends to the activity log between rewrites that drop expired lines
+ACTIVITY_COMPACTION_INTERVAL = 1000
+# Workspace/project changes within this window are written to disk together
+SAVE_DEBOUNCE_SECONDS = 0.5
+
 
 class UserRole(str, Enum):
     """User roles in workspace."""
@@ -37,42 +51,206 @@ class ProjectStatus(str, Enum):
     ARCHIVED = "archived"
 
 
+# Permissions granted with each workspace role (sets, so permission checks are O(1))
+PERMISSIONS_MAP: Mapping[UserRole, FrozenSet[str]] = MappingProxyType({
+    UserRole.OWNER: frozenset({"all"}),
+    UserRole.ADMIN: frozenset({
+        "create_project", "edit_project", "delete_project",
+        "invite_members", "remove_members", "manage_roles",
+        "view_all_projects", "edit_workspace_settings"
+    }),
+    UserRole.MEMBER: frozenset({
+        "create_project", "edit_own_project", "view_projects",
+        "classify_images", "view_results", "export_data"
+    }),
+    UserRole.VIEWER: frozenset({
+        "view_projects", "view_results"
+    })
+})
+
+
+class _OrderedIdSet(Dict[str, None]):
+    """Insertion-ordered set of ids (keys only), stored as a JSON list."""
+
+
+def _json_default(value: Any) -> Any:
+    """orjson fallback for stored data: permission sets are written as sorted lists, id sets as lists."""
+    if isinstance(value, _OrderedIdSet):
+        return list(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+# Dict subclasses such as _OrderedIdSet are only routed to _json_default with this option
+_JSON_OPTIONS = orjson.OPT_PASSTHROUGH_SUBCLASS
+
+# Read-only templates; each workspace/project gets its own copy since settings are mutable per entity
+DEFAULT_WORKSPACE_SETTINGS = MappingProxyType({
+    "allow_public_projects": False,
+    "require_approval_for_members": True,
+    "max_projects": 10,
+    "max_members": 20
+})
+DEFAULT_PROJECT_SETTINGS = MappingProxyType({
+    "default_model": "imagenet_mobilenet_v2",
+    "auto_save_results": True,
+    "allow_batch_processing": True,
+    "confidence_threshold": 0.5
+})
+
+
 class CollaborationService:
     """Service for managing team collaboration and shared workspaces."""
     
     def __init__(self):
-        self.cache_service = CacheService()
+        self.cache_service = cache_service  # Shared instance, connected at startup
         self.storage_path = Path(settings.MODEL_STORAGE_PATH) / "collaboration"
         self.storage_path.mkdir(parents=True, exist_ok=True)
         
         # Data files
         self.workspaces_file = self.storage_path / "workspaces.json"
         self.projects_file = self.storage_path / "projects.json"
-        self.activities_file = self.storage_path / "activities.json"
+        self.activities_file = self.storage_path / "activities.jsonl"  # Append-only, one activity per line
         
-        # Load data
+        # Load data; projects and activities are read on first use (see the properties below)
         self.workspaces = self._load_json_file(self.workspaces_file, {})
-        self.projects = self._load_json_file(self.projects_file, {})
-        self.activities = self._load_json_file(self.activities_file, [])
+        self._projects: Optional[Dict[str, Any]] = None
+        self._activities: Optional[Deque[Dict[str, Any]]] = None
+        self._workspace_activities: Optional[DefaultDict[str, Deque[Dict[str, Any]]]] = None
+        
+        # user_id -> ids of the workspaces they belong to
+        self._user_index: DefaultDict[str, Set[str]] = defaultdict(set)
+        for workspace_id, workspace in self.workspaces.items():
+            for member_id, member in workspace["members"].items():
+                self._user_index[member_id].add(workspace_id)
+                # Stored as JSON lists; checked as sets
+                member["permissions"] = frozenset(member.get("permissions", ()))
+            # Stored as a JSON list; kept as an ordered set for O(1) membership and removal
+            workspace["projects"] = _OrderedIdSet.fromkeys(workspace.get("projects", ()))
+        self._activity_lock = asyncio.Lock()  # Serialises appends and compaction
+        self._appends_since_compaction = 0
+        
+        # Files with unsaved changes -> the data to write; flushed by _delayed_flush
+        self._dirty_files: Dict[Path, Any] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        atexit.register(self.flush)
+    
+    @property
+    def projects(self) -> Dict[str, Any]:
+        """Projects by id, read from disk on first access."""
+        if self._projects is None:
+            self._projects = self._load_json_file(self.projects_file, {})
+        return self._projects
+    
+    @property
+    def activities(self) -> Deque[Dict[str, Any]]:
+        """Most recent activities, oldest first, read from the log on first access."""
+        if self._activities is None:
+            self._activities = self._load_activities()
+        return self._activities
+    
+    @property
+    def _activities_by_workspace(self) -> DefaultDict[str, Deque[Dict[str, Any]]]:
+        """The same activities split by workspace (appends arrive in timestamp order)."""
+        if self._workspace_activities is None:
+            by_workspace: DefaultDict[str, Deque[Dict[str, Any]]] = defaultdict(
+                lambda: deque(maxlen=MAX_ACTIVITIES)
+            )
+            for activity in self.activities:
+                by_workspace[activity["workspace_id"]].append(activity)
+            self._workspace_activities = by_workspace
+        return self._workspace_activities
     
     def _load_json_file(self, file_path: Path, default_value: Any) -> Any:
         """Load JSON file or return default value."""
         try:
             if file_path.exists():
-                with open(file_path, 'r') as f:
-                    return json.load(f)
+                with open(file_path, 'rb') as f:
+                    return orjson.loads(f.read())
         except Exception as e:
             print(f"Error loading {file_path}: {e}")
         return default_value
     
+    def _load_activities(self) -> Deque[Dict[str, Any]]:
+        """Load the most recent activities from the JSONL log (or the legacy JSON array)."""
+        activities: Deque[Dict[str, Any]] = deque(maxlen=MAX_ACTIVITIES)
+        try:
+            if self.activities_file.exists():
+                with open(self.activities_file, 'rb') as f:
+                    for line in f:
+                        try:
+                            activities.append(orjson.loads(line))
+                        except ValueError:
+                            # Torn last line from an interrupted append
+                            continue
+            else:
+                legacy_file = self.storage_path / "activities.json"
+                if legacy_file.exists():
+                    activities.extend(self._load_json_file(legacy_file, []))
+                    # Write the imported history out now; once the log exists the legacy file isn't read again
+                    self._rewrite_activities(list(activities))
+        except Exception as e:
+            print(f"Error loading {self.activities_file}: {e}")
+        return activities
+    
+    def _append_activity_line(self, line: bytes):
+        """Append one encoded activity to the log."""
+        with open(self.activities_file, 'ab') as f:
+            f.write(line)
+    
+    def _rewrite_activities(self, activities: List[Dict[str, Any]]):
+        """Replace the log with just the retained activities."""
+        tmp_path = self.activities_file.with_suffix(".jsonl.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.writelines(orjson.dumps(activity, option=orjson.OPT_APPEND_NEWLINE) for activity in activities)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.activities_file)
+    
     def _save_json_file(self, file_path: Path, data: Any):
         """Save data to JSON file."""
         try:
-            with open(file_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            self._write_file(file_path, orjson.dumps(data, default=_json_default, option=_JSON_OPTIONS | orjson.OPT_INDENT_2))
         except Exception as e:
             print(f"Error saving {file_path}: {e}")
     
+    @staticmethod
+    def _write_file(file_path: Path, payload: bytes):
+        """Atomically replace file_path with an encoded JSON document."""
+        # A crash mid-write leaves the previous file intact rather than a truncated one
+        tmp_path = file_path.with_suffix(file_path.suffix + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    
+    def _mark_dirty(self, file_path: Path, data: Any):
+        """Schedule a save of file_path; changes made within the debounce window share one write."""
+        self._dirty_files[file_path] = data
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._delayed_flush())
+    
+    async def _delayed_flush(self):
+        """Write dirty files once the debounce window has passed, until nothing is left dirty."""
+        loop = asyncio.get_running_loop()
+        while self._dirty_files:
+            await asyncio.sleep(SAVE_DEBOUNCE_SECONDS)
+            dirty, self._dirty_files = self._dirty_files, {}
+            for file_path, data in dirty.items():
+                try:
+                    # Encode here: the dicts keep changing on the event loop while the write runs
+                    payload = orjson.dumps(data, default=_json_default, option=_JSON_OPTIONS | orjson.OPT_INDENT_2)
+                    await loop.run_in_executor(None, self._write_file, file_path, payload)
+                except Exception as e:
+                    print(f"Error saving {file_path}: {e}")
+    
+    def flush(self):
+        """Write any pending workspace/project changes now (runs at interpreter exit)."""
+        dirty, self._dirty_files = self._dirty_files, {}
+        for file_path, data in dirty.items():
+            self._save_json_file(file_path, data)
+    
     async def create_workspace(
         self,
         name: str,
@@ -95,6 +273,7 @@ class CollaborationService:
         
         try:
             workspace_id = str(uuid.uuid4())
+            now = datetime.utcnow().isoformat()
             
             workspace = {
                 "workspace_id": workspace_id,
@@ -102,23 +281,18 @@ class CollaborationService:
                 "description": description,
                 "owner_id": owner_id,
                 "status": WorkspaceStatus.ACTIVE,
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat(),
-                "settings": settings or {
-                    "allow_public_projects": False,
-                    "require_approval_for_members": True,
-                    "max_projects": 10,
-                    "max_members": 20
-                },
+                "created_at": now,
+                "updated_at": now,
+                "settings": settings or dict(DEFAULT_WORKSPACE_SETTINGS),
                 "members": {
                     owner_id: {
                         "user_id": owner_id,
                         "role": UserRole.OWNER,
-                        "joined_at": datetime.utcnow().isoformat(),
-                        "permissions": ["all"]
+                        "joined_at": now,
+                        "permissions": PERMISSIONS_MAP[UserRole.OWNER]
                     }
                 },
-                "projects": [],
+                "projects": _OrderedIdSet(),
                 "statistics": {
                     "total_projects": 0,
                     "active_projects": 0,
@@ -129,7 +303,8 @@ class CollaborationService:
             
             # Save workspace
             self.workspaces[workspace_id] = workspace
-            self._save_json_file(self.workspaces_file, self.workspaces)
+            self._user_index[owner_id].add(workspace_id)
+            self._mark_dirty(self.workspaces_file, self.workspaces)
             
             # Log activity
             await self._log_activity(
@@ -140,11 +315,7 @@ class CollaborationService:
             )
             
             # Cache workspace info
-            await self.cache_service.set(
-                f"workspace:{workspace_id}",
-                json.dumps(workspace),
-                ttl=3600
-            )
+            await self._cache_entity(f"workspace:{workspace_id}", workspace)
             
             return {
                 "success": True,
@@ -199,8 +370,7 @@ class CollaborationService:
             if invited_by not in workspace["members"]:
                 return {"success": False, "error": "Inviter is not a workspace member"}
             
-            inviter_role = workspace["members"][invited_by]["role"]
-            if inviter_role not in [UserRole.OWNER, UserRole.ADMIN]:
+            if not self._has_permission(workspace["members"][invited_by], "invite_members"):
                 return {"success": False, "error": "Insufficient permissions to invite members"}
             
             # Check member limit
@@ -209,19 +379,21 @@ class CollaborationService:
                 return {"success": False, "error": f"Workspace member limit ({max_members}) reached"}
             
             # Add member
-            workspace["members"][user_id] = {
+            now = datetime.utcnow().isoformat()
+            workspace["members"][user_id] = member_info = {
                 "user_id": user_id,
                 "role": role,
-                "joined_at": datetime.utcnow().isoformat(),
+                "joined_at": now,
                 "invited_by": invited_by,
                 "permissions": self._get_role_permissions(role)
             }
             
-            workspace["updated_at"] = datetime.utcnow().isoformat()
+            workspace["updated_at"] = now
             workspace["statistics"]["total_members"] = len(workspace["members"])
+            self._user_index[user_id].add(workspace_id)
             
             # Save changes
-            self._save_json_file(self.workspaces_file, self.workspaces)
+            self._mark_dirty(self.workspaces_file, self.workspaces)
             
             # Log activity
             await self._log_activity(
@@ -235,16 +407,12 @@ class CollaborationService:
             )
             
             # Update cache
-            await self.cache_service.set(
-                f"workspace:{workspace_id}",
-                json.dumps(workspace),
-                ttl=3600
-            )
+            await self._cache_entity(f"workspace:{workspace_id}", workspace)
             
             return {
                 "success": True,
                 "message": f"User {user_id} added to workspace with role {role}",
-                "member_info": workspace["members"][user_id]
+                "member_info": {**member_info, "permissions": sorted(member_info["permissions"])}
             }
             
         except Exception as e:
@@ -253,24 +421,22 @@ class CollaborationService:
                 "error": f"Failed to add member: {str(e)}"
             }
     
-    def _get_role_permissions(self, role: UserRole) -> List[str]:
+    async def _cache_entity(self, key: str, entity: Dict[str, Any]):
+        """Cache a workspace/project, encoded here since its sets aren't plain JSON."""
+        payload = orjson.dumps(entity, default=_json_default, option=_JSON_OPTIONS)
+        await self.cache_service.set_encoded(key, payload, ttl=3600)
+    
+    @staticmethod
+    def _has_permission(member: Dict[str, Any], permission: str) -> bool:
+        """Whether a workspace member may perform an action; owners may do anything."""
+        if member["role"] == UserRole.OWNER:
+            return True
+        permissions = member["permissions"]
+        return permission in permissions or "all" in permissions
+    
+    def _get_role_permissions(self, role: UserRole) -> FrozenSet[str]:
         """Get permissions for user role."""
-        permissions_map = {
-            UserRole.OWNER: ["all"],
-            UserRole.ADMIN: [
-                "create_project", "edit_project", "delete_project",
-                "invite_members", "remove_members", "manage_roles",
-                "view_all_projects", "edit_workspace_settings"
-            ],
-            UserRole.MEMBER: [
-                "create_project", "edit_own_project", "view_projects",
-                "classify_images", "view_results", "export_data"
-            ],
-            UserRole.VIEWER: [
-                "view_projects", "view_results"
-            ]
-        }
-        return permissions_map.get(role, [])
+        return PERMISSIONS_MAP.get(role, frozenset())
     
     async def create_project(
         self,
@@ -306,8 +472,7 @@ class CollaborationService:
             if creator_id not in workspace["members"]:
                 return {"success": False, "error": "User is not a workspace member"}
             
-            creator_permissions = workspace["members"][creator_id]["permissions"]
-            if "create_project" not in creator_permissions and "all" not in creator_permissions:
+            if not self._has_permission(workspace["members"][creator_id], "create_project"):
                 return {"success": False, "error": "Insufficient permissions to create project"}
             
             # Check project limit
@@ -316,6 +481,7 @@ class CollaborationService:
                 return {"success": False, "error": f"Workspace project limit ({max_projects}) reached"}
             
             project_id = str(uuid.uuid4())
+            now = datetime.utcnow().isoformat()
             
             project = {
                 "project_id": project_id,
@@ -325,19 +491,14 @@ class CollaborationService:
                 "type": project_type,
                 "creator_id": creator_id,
                 "status": ProjectStatus.DRAFT,
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat(),
-                "settings": settings or {
-                    "default_model": "imagenet_mobilenet_v2",
-                    "auto_save_results": True,
-                    "allow_batch_processing": True,
-                    "confidence_threshold": 0.5
-                },
+                "created_at": now,
+                "updated_at": now,
+                "settings": settings or dict(DEFAULT_PROJECT_SETTINGS),
                 "collaborators": {
                     creator_id: {
                         "user_id": creator_id,
                         "role": "owner",
-                        "joined_at": datetime.utcnow().isoformat(),
+                        "joined_at": now,
                         "permissions": ["all"]
                     }
                 },
@@ -348,20 +509,20 @@ class CollaborationService:
                     "total_classifications": 0,
                     "total_images": 0,
                     "avg_confidence": 0.0,
-                    "last_activity": datetime.utcnow().isoformat()
+                    "last_activity": now
                 }
             }
             
             # Add project to workspace
-            workspace["projects"].append(project_id)
+            workspace["projects"][project_id] = None
             workspace["statistics"]["total_projects"] += 1
             workspace["statistics"]["active_projects"] += 1
-            workspace["updated_at"] = datetime.utcnow().isoformat()
+            workspace["updated_at"] = now
             
             # Save project
             self.projects[project_id] = project
-            self._save_json_file(self.projects_file, self.projects)
-            self._save_json_file(self.workspaces_file, self.workspaces)
+            self._mark_dirty(self.projects_file, self.projects)
+            self._mark_dirty(self.workspaces_file, self.workspaces)
             
             # Log activity
             await self._log_activity(
@@ -375,12 +536,9 @@ class CollaborationService:
                 }
             )
             
-            # Cache project info
-            await self.cache_service.set(
-                f"project:{project_id}",
-                json.dumps(project),
-                ttl=3600
-            )
+            # Cache project info, and the workspace whose project list changed
+            await self._cache_entity(f"project:{project_id}", project)
+            await self._cache_entity(f"workspace:{workspace_id}", workspace)
             
             return {
                 "success": True,
@@ -419,22 +577,10 @@ class CollaborationService:
         """
         
         try:
-            # Check cache first
-            cached_workspace = await self.cache_service.get(f"workspace:{workspace_id}")
-            if cached_workspace:
-                workspace = json.loads(cached_workspace)
-            else:
-                if workspace_id not in self.workspaces:
-                    return {"error": "Workspace not found"}
-                
-                workspace = self.workspaces[workspace_id]
-                
-                # Cache for future requests
-                await self.cache_service.set(
-                    f"workspace:{workspace_id}",
-                    json.dumps(workspace),
-                    ttl=3600
-                )
+            # This process's copy is authoritative; the cache only carries it to other workers
+            workspace = self.workspaces.get(workspace_id)
+            if workspace is None:
+                return {"error": "Workspace not found"}
             
             # Check user permissions
             if requesting_user_id not in workspace["members"]:
@@ -450,31 +596,28 @@ class CollaborationService:
                 "updated_at": workspace["updated_at"],
                 "statistics": workspace["statistics"],
                 "settings": workspace["settings"],
-                "members": []
+                # Member information without sensitive details
+                "members": [
+                    {"user_id": user_id, "role": member_info["role"], "joined_at": member_info["joined_at"]}
+                    for user_id, member_info in workspace["members"].items()
+                ]
             }
             
-            # Add member information (without sensitive details)
-            for user_id, member_info in workspace["members"].items():
-                response["members"].append({
-                    "user_id": user_id,
-                    "role": member_info["role"],
-                    "joined_at": member_info["joined_at"]
-                })
-            
             # Add project summaries
-            response["projects"] = []
-            for project_id in workspace["projects"]:
-                if project_id in self.projects:
-                    project = self.projects[project_id]
-                    response["projects"].append({
-                        "project_id": project["project_id"],
-                        "name": project["name"],
-                        "type": project["type"],
-                        "status": project["status"],
-                        "creator_id": project["creator_id"],
-                        "updated_at": project["updated_at"],
-                        "statistics": project["statistics"]
-                    })
+            projects = self.projects
+            response["projects"] = [
+                {
+                    "project_id": project["project_id"],
+                    "name": project["name"],
+                    "type": project["type"],
+                    "status": project["status"],
+                    "creator_id": project["creator_id"],
+                    "updated_at": project["updated_at"],
+                    "statistics": project["statistics"]
+                }
+                for project in map(projects.get, workspace["projects"])
+                if project is not None
+            ]
             
             return response
             
@@ -495,23 +638,24 @@ class CollaborationService:
         try:
             user_workspaces = []
             
-            for workspace_id, workspace in self.workspaces.items():
-                if user_id in workspace["members"]:
-                    member_info = workspace["members"][user_id]
-                    
-                    workspace_summary = {
-                        "workspace_id": workspace_id,
-                        "name": workspace["name"],
-                        "description": workspace["description"],
-                        "status": workspace["status"],
-                        "user_role": member_info["role"],
-                        "joined_at": member_info["joined_at"],
-                        "member_count": len(workspace["members"]),
-                        "project_count": len(workspace["projects"]),
-                        "last_updated": workspace["updated_at"]
-                    }
-                    
-                    user_workspaces.append(workspace_summary)
+            for workspace_id in self._user_index.get(user_id, ()):
+                workspace = self.workspaces[workspace_id]
+                member_info = workspace["members"][user_id]
+                statistics = workspace["statistics"]  # Counts are maintained on every mutation
+                
+                workspace_summary = {
+                    "workspace_id": workspace_id,
+                    "name": workspace["name"],
+                    "description": workspace["description"],
+                    "status": workspace["status"],
+                    "user_role": member_info["role"],
+                    "joined_at": member_info["joined_at"],
+                    "member_count": statistics["total_members"],
+                    "project_count": statistics["total_projects"],
+                    "last_updated": workspace["updated_at"]
+                }
+                
+                user_workspaces.append(workspace_summary)
             
             # Sort by last updated
             user_workspaces.sort(key=lambda x: x["last_updated"], reverse=True)
@@ -544,22 +688,10 @@ class CollaborationService:
         """
         
         try:
-            # Check cache first
-            cached_project = await self.cache_service.get(f"project:{project_id}")
-            if cached_project:
-                project = json.loads(cached_project)
-            else:
-                if project_id not in self.projects:
-                    return {"error": "Project not found"}
-                
-                project = self.projects[project_id]
-                
-                # Cache for future requests
-                await self.cache_service.set(
-                    f"project:{project_id}",
-                    json.dumps(project),
-                    ttl=3600
-                )
+            # This process's copy is authoritative; the cache only carries it to other workers
+            project = self.projects.get(project_id)
+            if project is None:
+                return {"error": "Project not found"}
             
             # Check user access
             workspace_id = project["workspace_id"]
@@ -604,7 +736,7 @@ class CollaborationService:
         
         try:
             activity = {
-                "activity_id": str(uuid.uuid4()),
+                "activity_id": uuid.uuid4().hex,
                 "workspace_id": workspace_id,
                 "project_id": project_id,
                 "user_id": user_id,
@@ -613,13 +745,22 @@ class CollaborationService:
                 "timestamp": datetime.utcnow().isoformat()
             }
             
-            self.activities.append(activity)
-            
-            # Keep only last 1000 activities
-            if len(self.activities) > 1000:
-                self.activities = self.activities[-1000:]
-            
-            self._save_json_file(self.activities_file, self.activities)
+            line = orjson.dumps(activity, option=orjson.OPT_APPEND_NEWLINE)
+            
+            loop = asyncio.get_running_loop()
+            # Memory and file change together, so a compaction never snapshots an entry whose line is still to come
+            async with self._activity_lock:
+                # The deque drops the oldest entry itself once MAX_ACTIVITIES is reached
+                by_workspace = self._activities_by_workspace  # Loads the log first, so the new entry isn't counted twice
+                self.activities.append(activity)
+                by_workspace[workspace_id].append(activity)
+                await loop.run_in_executor(None, self._append_activity_line, line)
+                self._appends_since_compaction += 1
+                
+                # The file only grows; periodically drop lines that fell out of the deque
+                if self._appends_since_compaction >= ACTIVITY_COMPACTION_INTERVAL:
+                    await loop.run_in_executor(None, self._rewrite_activities, list(self.activities))
+                    self._appends_since_compaction = 0
             
         except Exception as e:
             print(f"Error logging activity: {e}")
@@ -651,15 +792,10 @@ class CollaborationService:
             if requesting_user_id not in workspace["members"]:
                 return {"error": "Access denied"}
             
-            # Filter activities for this workspace
-            workspace_activities = [
-                activity for activity in self.activities
-                if activity["workspace_id"] == workspace_id
-            ]
-            
-            # Sort by timestamp (newest first) and limit
-            workspace_activities.sort(key=lambda x: x["timestamp"], reverse=True)
-            workspace_activities = workspace_activities[:limit]
+            # Newest first; the per-workspace log is already in timestamp order
+            workspace_activities = list(itertools.islice(
+                reversed(self._activities_by_workspace.get(workspace_id, ())), limit
+            ))
             
             return {
                 "activities": workspace_activities,